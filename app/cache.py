@@ -0,0 +1,63 @@
+from typing import Final
+
+from fastapi import Depends
+from loguru import logger
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from .config import settings
+
+STATISTICS_CACHE_NAMESPACE: Final = "stats:v1"
+STATISTICS_CACHE_TTL: Final = 60
+
+redis_client = Redis.from_url(settings.db_url_redis, decode_responses=False)
+
+
+def get_redis() -> Redis:
+    return redis_client
+
+
+class StatisticsCache:
+    """
+    Cached statistics response keyed by a generation counter.
+
+    Writes bump the generation, so a read that raced with a write stores its
+    result under a generation nobody asks for anymore. Redis errors are logged
+    and treated as a cache miss.
+    """
+
+    def __init__(self, redis: Redis, namespace: str = STATISTICS_CACHE_NAMESPACE):
+        self._redis = redis
+        self._namespace = namespace
+        self._generation_key = f"{namespace}:generation"
+
+    def _key(self, generation: int) -> str:
+        return f"{self._namespace}:{generation}"
+
+    async def get(self) -> tuple[int | None, bytes | None]:
+        try:
+            generation = int(await self._redis.get(self._generation_key) or 0)
+            return generation, await self._redis.get(self._key(generation))
+        except RedisError:
+            logger.exception("Failed to read statistics cache")
+            return None, None
+
+    async def set(self, generation: int | None, payload: str) -> None:
+        if generation is None:
+            return
+        try:
+            await self._redis.set(
+                self._key(generation), payload, ex=STATISTICS_CACHE_TTL
+            )
+        except RedisError:
+            logger.exception("Failed to write statistics cache")
+
+    async def invalidate(self) -> None:
+        try:
+            await self._redis.incr(self._generation_key)
+        except RedisError:
+            logger.exception("Failed to invalidate statistics cache")
+
+
+def get_statistics_cache(redis: Redis = Depends(get_redis)) -> StatisticsCache:
+    return StatisticsCache(redis)
@@ -1,4 +1,4 @@
-from functools import lru_cache
+from functools import cache
 from pathlib import Path
 from typing import Final
 
@@ -42,15 +42,9 @@ class Settings(BaseSettings):
         return f"redis://@{self.REDIS_HOST}:{self.REDIS_PORT}/"
 
 
-settings_instance = None
-
-
-@lru_cache(maxsize=2)
+@cache
 def get_settings() -> Settings:
-    global settings_instance
-    if settings_instance is None:
-        settings_instance = Settings()
-    return settings_instance
+    return Settings()
 
 
 settings = get_settings()
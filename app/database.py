@@ -11,7 +11,6 @@ from sqlalchemy.ext.asyncio import (
     async_sessionmaker,
     create_async_engine,
 )
-from sqlalchemy.pool import NullPool
 
 from .config import settings
 from .utils import handle_error
@@ -26,16 +25,15 @@ class DatabaseConfig:
         db_url_postgresql: str,
     ):
         self.db_url_postgresql = db_url_postgresql
-
-    @property
-    def engine(self):
-        return create_async_engine(
-            self.db_url_postgresql, echo=settings.ECHO, poolclass=NullPool
+        self.engine = create_async_engine(
+            self.db_url_postgresql,
+            echo=settings.ECHO,
+            pool_size=10,
+            max_overflow=40,
+            pool_recycle=1800,
+            pool_pre_ping=True,
         )
-
-    @property
-    def async_session_maker(self):
-        return async_sessionmaker(
+        self.async_session_maker = async_sessionmaker(
             self.engine,
             class_=AsyncSession,
             expire_on_commit=False,
@@ -70,9 +68,15 @@ class IUnitOfWorkBase(ABC):
 db_config = DatabaseConfig(settings.db_url_postgresql)
 
 
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    return db_config.async_session_maker
+
+
 class PgUnitOfWork(IUnitOfWorkBase):
-    def __init__(self) -> None:
-        self._session_factory = db_config.async_session_maker
+    def __init__(
+        self, session_factory: async_sessionmaker[AsyncSession] | None = None
+    ) -> None:
+        self._session_factory = session_factory or db_config.async_session_maker
         self._async_session: AsyncSession | None = None
 
     def activate_session(self):
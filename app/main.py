@@ -1,19 +1,23 @@
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
+from .cache import redis_client
 from .routers import router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     yield
+    await redis_client.aclose()
 
 
 app = FastAPI(
     title="Transaction Service",
     description="A microservice for processing transactions",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     version="1.0.0",
 )
 
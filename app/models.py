@@ -1,8 +1,7 @@
 import uuid
 from datetime import datetime
-from typing import List, Optional
 
-from sqlalchemy import JSON, DateTime, Float, String
+from sqlalchemy import DateTime, Float, Index, String
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, declared_attr, mapped_column
 
@@ -38,8 +37,4 @@ class Transaction(General):
     currency: Mapped[str] = mapped_column(String)
     timestamp: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-
-class Statistics(General):
-    total_transactions: Mapped[int] = mapped_column(default=0)
-    average_amount: Mapped[float] = mapped_column(Float, default=0.0)
-    top_transactions: Mapped[Optional[List[dict]]] = mapped_column(JSON, default=list)
+    __table_args__ = (Index("ix_transaction_amount_desc", amount.desc()),)
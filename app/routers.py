@@ -1,20 +1,52 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import delete, select
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy import JSON, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from app.database import PgUnitOfWork
+from app.database import PgUnitOfWork, get_session_factory
 from app.utils import verify_api_key
 
-from .celery import celery_app
-from .models import Statistics, Transaction
+from .cache import StatisticsCache, get_statistics_cache
+from .models import Transaction
 from .schemas import (
     StatisticsResponse,
-    TopTransaction,
     TransactionCreate,
     TransactionResponse,
 )
 
 router = APIRouter(prefix="/api/v1")
 
+_top = (
+    select(Transaction.transaction_id, Transaction.amount)
+    .order_by(Transaction.amount.desc())
+    .limit(3)
+    .subquery()
+)
+
+statistics_query = select(
+    func.count().label("total_transactions"),
+    func.coalesce(func.avg(Transaction.amount), 0.0).label("average_amount"),
+    select(
+        func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "transaction_id",
+                        _top.c.transaction_id,
+                        "amount",
+                        _top.c.amount,
+                    ),
+                    _top.c.amount.desc(),
+                ),
+                type_=JSON,
+            ),
+            literal([], JSON),
+        )
+    )
+    .scalar_subquery()
+    .label("top_transactions"),
+)
+
 
 @router.post(
     "/transactions",
@@ -24,29 +56,25 @@ router = APIRouter(prefix="/api/v1")
 async def create_transaction(
     transaction: TransactionCreate,
     _=Depends(verify_api_key),
+    session_factory=Depends(get_session_factory),
+    cache: StatisticsCache = Depends(get_statistics_cache),
 ):
-    async with PgUnitOfWork() as db:
+    async with PgUnitOfWork(session_factory) as db:
         result = await db.execute(
-            select(Transaction).where(
-                Transaction.transaction_id == transaction.transaction_id
-            )
+            pg_insert(Transaction)
+            .values(**transaction.model_dump())
+            .on_conflict_do_nothing(index_elements=["transaction_id"])
+            .returning(Transaction.id)
         )
-        existing = result.scalar_one_or_none()
 
-        if existing:
+        if result.scalar_one_or_none() is None:
             raise HTTPException(status_code=400, detail="Transaction ID already exists")
 
-        db_transaction = Transaction(**transaction.model_dump())
-        db.add(db_transaction)
         await db.commit()
-        await db.refresh(db_transaction)
 
-    task = celery_app.send_task("app.tasks.update_statistics")
+    await cache.invalidate()
 
-    return TransactionResponse(
-        message="Transaction received",
-        task_id=task.id,
-    )
+    return TransactionResponse(message="Transaction received")
 
 
 @router.delete(
@@ -55,11 +83,14 @@ async def create_transaction(
 )
 async def delete_transactions(
     _=Depends(verify_api_key),
+    session_factory=Depends(get_session_factory),
+    cache: StatisticsCache = Depends(get_statistics_cache),
 ):
-    async with PgUnitOfWork() as db:
+    async with PgUnitOfWork(session_factory) as db:
         await db.execute(delete(Transaction))
-        await db.execute(delete(Statistics))
         await db.commit()
+
+    await cache.invalidate()
     return {"message": "Transactions deleted"}
 
 
@@ -70,27 +101,20 @@ async def delete_transactions(
 )
 async def get_statistics(
     _=Depends(verify_api_key),
+    session_factory=Depends(get_session_factory),
+    cache: StatisticsCache = Depends(get_statistics_cache),
 ):
-    async with PgUnitOfWork() as db:
-        result = await db.execute(select(Statistics))
-        stats = result.scalar_one_or_none()
+    generation, cached = await cache.get()
+    if cached:
+        return Response(cached, media_type="application/json")
 
-    if not stats:
-        return StatisticsResponse(
-            total_transactions=0, average_transaction_amount=0.0, top_transactions=[]
-        )
-
-    top_transactions = (
-        [
-            TopTransaction(transaction_id=t["transaction_id"], amount=t["amount"])
-            for t in stats.top_transactions
-        ]
-        if stats.top_transactions
-        else []
-    )
+    async with PgUnitOfWork(session_factory) as db:
+        stats = (await db.execute(statistics_query)).one()
 
-    return StatisticsResponse(
+    response = StatisticsResponse(
         total_transactions=stats.total_transactions,
         average_transaction_amount=stats.average_amount,
-        top_transactions=top_transactions,
+        top_transactions=stats.top_transactions,
     )
+    await cache.set(generation, response.model_dump_json())
+    return response
@@ -18,7 +18,13 @@ class TransactionBase(BaseModel):
     currency: str
     timestamp: datetime
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(
+        from_attributes=True,
+        frozen=True,
+        extra="ignore",
+        str_strip_whitespace=False,
+        use_enum_values=True,
+    )
 
 
 class TransactionCreate(TransactionBase):
@@ -27,7 +33,6 @@ class TransactionCreate(TransactionBase):
 
 class TransactionResponse(BaseModel):
     message: str
-    task_id: str
 
 
 class StatisticsResponse(BaseModel):
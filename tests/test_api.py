@@ -5,58 +5,167 @@ from typing import AsyncGenerator
 
 import pytest
 import pytest_asyncio
-from httpx import AsyncClient
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
+from fastapi import Depends
+from redis.asyncio import Redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
 
+from app.cache import StatisticsCache, get_redis, get_statistics_cache
 from app.config import settings
+from app.database import get_session_factory
 from app.main import app
-from app.models import Base
+from app.models import Base, Transaction
 
-# Test database setup - using async driver
+# Test database setup - using async driver, one database per xdist worker
 TEST_DB_NAME = "transactions_test"
-SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.PG_USER}:{settings.PG_PASS}@{settings.PG_HOST}:{settings.PG_PORT}/{TEST_DB_NAME}"
-
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
-test_async_session = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+WORKER_ID = os.environ.get("PYTEST_XDIST_WORKER", "gw0")
+WORKER_DB_NAME = f"{TEST_DB_NAME}_{WORKER_ID}"
+PG_SERVER_URL = f"postgresql+asyncpg://{settings.PG_USER}:{settings.PG_PASS}@{settings.PG_HOST}:{settings.PG_PORT}"
+SQLALCHEMY_DATABASE_URL = f"{PG_SERVER_URL}/{WORKER_DB_NAME}"
+# Workers share one Redis db, each caches statistics under its own namespace
+CACHE_NAMESPACE = f"stats:test:{WORKER_ID}"
+
+AUTH_HEADERS = {"Authorization": settings.API_KEY}
+
+# Assertions never look at the timestamp, so all payloads share one
+_DT = datetime(2024, 1, 1, 12, 0, 0)
+_TS = _DT.isoformat()
+
+TRUNCATE_ALL = text(
+    f"TRUNCATE {', '.join(t.name for t in reversed(Base.metadata.sorted_tables))} "
+    "RESTART IDENTITY CASCADE"
 )
 
 
-@pytest_asyncio.fixture
-async def setup_db():
-    # Create tables
+async def truncate_all(conn: AsyncConnection) -> None:
+    await conn.execute(TRUNCATE_ALL)
+
+
+async def seed_transactions(conn: AsyncConnection, rows: list[dict]) -> None:
+    # Inserts rows directly, for tests that need data but don't exercise POST
+    await conn.execute(Transaction.__table__.insert(), rows)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def create_test_db():
+    admin_engine = create_async_engine(
+        f"{PG_SERVER_URL}/postgres", isolation_level="AUTOCOMMIT", poolclass=NullPool
+    )
+    async with admin_engine.connect() as conn:
+        exists = await conn.scalar(
+            text("SELECT 1 FROM pg_database WHERE datname = :name"),
+            {"name": WORKER_DB_NAME},
+        )
+        if not exists:
+            await conn.execute(text(f'CREATE DATABASE "{WORKER_DB_NAME}"'))
+    await admin_engine.dispose()
+
+
+def get_test_statistics_cache(redis: Redis = Depends(get_redis)) -> StatisticsCache:
+    return StatisticsCache(redis, namespace=CACHE_NAMESPACE)
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def redis():
+    redis = Redis.from_url(settings.db_url_redis)
+    app.dependency_overrides[get_redis] = lambda: redis
+    app.dependency_overrides[get_statistics_cache] = get_test_statistics_cache
+
+    yield redis
+
+    app.dependency_overrides.pop(get_statistics_cache, None)
+    app.dependency_overrides.pop(get_redis, None)
+    await redis.aclose()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def engine(create_test_db):
+    # Savepoint tests hold one connection, committed_db tests need several,
+    # so use the async queue pool rather than NullPool
+    engine = create_async_engine(
+        SQLALCHEMY_DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=5,
+        max_overflow=10,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+    )
+
+    yield engine
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def setup_db(engine):
+    # Create tables once for the whole session
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
 
-    # Provide the session
     yield
 
     # Clean up
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
-    await engine.dispose()
 
+@pytest_asyncio.fixture(loop_scope="session", autouse=True)
+async def db_session(engine, setup_db, redis):
+    # Each test runs inside an outer transaction that is rolled back afterwards,
+    # the app's sessions only create savepoints within it.
+    conn = await engine.connect()
+    trans = await conn.begin()
+    session_factory = async_sessionmaker(
+        bind=conn,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    await StatisticsCache(redis, namespace=CACHE_NAMESPACE).invalidate()
+
+    yield conn
+
+    app.dependency_overrides.pop(get_session_factory, None)
+    await trans.rollback()
+    await conn.close()
 
-@pytest_asyncio.fixture
-async def async_client(setup_db) -> AsyncGenerator[AsyncClient, None]:
-    # Override the dependency to use test database
-    original_db_url = os.environ.get("DATABASE_URL")
-    os.environ["DATABASE_URL"] = SQLALCHEMY_DATABASE_URL
 
-    # Create client
-    async with AsyncClient(app=app, base_url="http://test") as client:
-        yield client
+@pytest_asyncio.fixture(loop_scope="session")
+async def committed_db(engine, db_session):
+    # Concurrent requests can't share the savepoint connection, so these tests
+    # commit through the pool and leave empty tables for the ones that follow.
+    session_factory = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+
+    yield
 
-    # Restore original environment
-    if original_db_url:
-        os.environ["DATABASE_URL"] = original_db_url
-    else:
-        os.environ.pop("DATABASE_URL", None)
+    async with engine.begin() as conn:
+        await truncate_all(conn)
 
 
-@pytest.mark.asyncio
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def async_client() -> AsyncGenerator[AsyncClient, None]:
+    # The test database is wired in through dependency overrides in db_session
+    async with LifespanManager(app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            yield client
+
+
+@pytest.mark.asyncio(loop_scope="session")
 async def test_create_transaction(async_client):
     response = await async_client.post(
         "/api/v1/transactions",
@@ -65,16 +174,15 @@ async def test_create_transaction(async_client):
             "user_id": "user1",
             "amount": 100.50,
             "currency": "USD",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _TS,
         },
-        headers={"Authorization": settings.API_KEY},
+        headers=AUTH_HEADERS,
     )
     assert response.status_code == 201
     assert response.json()["message"] == "Transaction received"
-    assert "task_id" in response.json()
 
 
-@pytest.mark.asyncio
+@pytest.mark.asyncio(loop_scope="session")
 async def test_duplicate_transaction(async_client):
     # Create transaction
     transaction_data = {
@@ -82,14 +190,14 @@ async def test_duplicate_transaction(async_client):
         "user_id": "user1",
         "amount": 100.50,
         "currency": "USD",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": _TS,
     }
 
     # First request should succeed
     response1 = await async_client.post(
         "/api/v1/transactions",
         json=transaction_data,
-        headers={"Authorization": settings.API_KEY},
+        headers=AUTH_HEADERS,
     )
     assert response1.status_code == 201
 
@@ -97,37 +205,152 @@ async def test_duplicate_transaction(async_client):
     response2 = await async_client.post(
         "/api/v1/transactions",
         json=transaction_data,
-        headers={"Authorization": settings.API_KEY},
+        headers=AUTH_HEADERS,
     )
     assert response2.status_code == 400
     assert "already exists" in response2.json()["detail"]
 
 
-@pytest.mark.asyncio
-async def test_delete_transactions(async_client):
-    # Create a transaction first
+@pytest.mark.asyncio(loop_scope="session")
+async def test_invalid_api_key(async_client):
+    response = await async_client.get(
+        "/api/v1/statistics", headers={"Authorization": "invalid-key"}
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_statistics_empty(async_client):
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_transactions"] == 0
+    assert data["average_transaction_amount"] == 0.0
+    assert data["top_transactions"] == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_statistics_cache_hit(async_client, db_session):
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert response.json()["total_transactions"] == 0
+
+    # Rows inserted behind the API's back don't invalidate the cache
+    await seed_transactions(
+        db_session,
+        [
+            {
+                "transaction_id": "cached_test",
+                "user_id": "user1",
+                "amount": 100.0,
+                "currency": "USD",
+                "timestamp": _DT,
+            }
+        ],
+    )
+
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert response.status_code == 200
+    assert response.json()["total_transactions"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_statistics_cache_invalidated_on_create(async_client):
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert response.json()["total_transactions"] == 0
+
     await async_client.post(
         "/api/v1/transactions",
         json={
-            "transaction_id": "delete_test",
+            "transaction_id": "invalidate_test",
             "user_id": "user1",
-            "amount": 100.50,
+            "amount": 100.0,
             "currency": "USD",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": _TS,
         },
-        headers={"Authorization": settings.API_KEY},
+        headers=AUTH_HEADERS,
     )
 
-    # Then delete all transactions
-    response = await async_client.delete(
-        "/api/v1/transactions", headers={"Authorization": settings.API_KEY}
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    data = response.json()
+    assert data["total_transactions"] == 1
+    assert data["average_transaction_amount"] == 100.0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_statistics_cache_invalidated_on_delete(async_client, db_session):
+    await seed_transactions(
+        db_session,
+        [
+            {
+                "transaction_id": "invalidate_test",
+                "user_id": "user1",
+                "amount": 100.0,
+                "currency": "USD",
+                "timestamp": _DT,
+            }
+        ],
+    )
+
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert response.json()["total_transactions"] == 1
+
+    await async_client.delete("/api/v1/transactions", headers=AUTH_HEADERS)
+
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    data = response.json()
+    assert data["total_transactions"] == 0
+    assert data["top_transactions"] == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_redis_unavailable(async_client, redis):
+    # Nothing listens on port 1, every cache call fails
+    unavailable = Redis(host=settings.REDIS_HOST, port=1)
+    app.dependency_overrides[get_redis] = lambda: unavailable
+    try:
+        response = await async_client.post(
+            "/api/v1/transactions",
+            json={
+                "transaction_id": "no_redis_test",
+                "user_id": "user1",
+                "amount": 100.0,
+                "currency": "USD",
+                "timestamp": _TS,
+            },
+            headers=AUTH_HEADERS,
+        )
+        assert response.status_code == 201
+
+        response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+        assert response.status_code == 200
+        assert response.json()["total_transactions"] == 1
+    finally:
+        app.dependency_overrides[get_redis] = lambda: redis
+        await unavailable.aclose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_transactions(async_client, db_session):
+    # Create a transaction first
+    await seed_transactions(
+        db_session,
+        [
+            {
+                "transaction_id": "delete_test",
+                "user_id": "user1",
+                "amount": 100.50,
+                "currency": "USD",
+                "timestamp": _DT,
+            }
+        ],
     )
+
+    # Then delete all transactions
+    response = await async_client.delete("/api/v1/transactions", headers=AUTH_HEADERS)
     assert response.status_code == 204
 
     # Verify statistics are reset
-    stats_response = await async_client.get(
-        "/api/v1/statistics", headers={"Authorization": settings.API_KEY}
-    )
+    stats_response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
     assert stats_response.status_code == 200
     stats_data = stats_response.json()
     assert stats_data["total_transactions"] == 0
@@ -135,84 +358,81 @@ async def test_delete_transactions(async_client):
     assert len(stats_data["top_transactions"]) == 0
 
 
-@pytest.mark.asyncio
-async def test_get_statistics(async_client):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_get_statistics(async_client, db_session):
     # Create multiple transactions
-    transactions = [
-        {
-            "transaction_id": f"test{i}",
-            "user_id": f"user{i}",
-            "amount": 100.0 * (i + 1),
-            "currency": "USD",
-            "timestamp": datetime.utcnow().isoformat(),
-        }
-        for i in range(3)
-    ]
-
-    for transaction in transactions:
-        await async_client.post(
-            "/api/v1/transactions",
-            json=transaction,
-            headers={"Authorization": settings.API_KEY},
-        )
-
-    # Allow time for the Celery task to complete
-    await asyncio.sleep(1)
+    base = {"currency": "USD", "timestamp": _DT}
+    await seed_transactions(
+        db_session,
+        [
+            {
+                **base,
+                "transaction_id": f"test{i}",
+                "user_id": f"user{i}",
+                "amount": 100.0 * (i + 1),
+            }
+            for i in range(3)
+        ],
+    )
 
     # Get statistics
-    response = await async_client.get(
-        "/api/v1/statistics", headers={"Authorization": settings.API_KEY}
-    )
+    response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
     assert response.status_code == 200
     data = response.json()
     assert data["total_transactions"] == 3
     assert data["average_transaction_amount"] == 200.0
     assert len(data["top_transactions"]) == 3
-    # Verify top transaction has the highest amount
-    assert data["top_transactions"][0]["amount"] == 300.0
-    assert data["top_transactions"][0]["transaction_id"] == "test2"
+    # Verify top transactions are ordered by amount, highest first
+    assert [t["amount"] for t in data["top_transactions"]] == [300.0, 200.0, 100.0]
+    assert [t["transaction_id"] for t in data["top_transactions"]] == [
+        "test2",
+        "test1",
+        "test0",
+    ]
 
 
-@pytest.mark.asyncio
-async def test_race_condition(async_client):
+@pytest.mark.asyncio(loop_scope="session")
+async def test_race_condition(async_client, committed_db):
     """Test creating multiple transactions concurrently to simulate race conditions"""
 
     # Define a large number of concurrent transactions
     num_transactions = 50
+    base = {"currency": "USD", "timestamp": _TS}
     transactions = [
         {
+            **base,
             "transaction_id": f"race{i}",
             "user_id": f"user{i % 5}",  # Reuse some user_ids
             "amount": float(i * 10),  # Different amounts
-            "currency": "USD",
-            "timestamp": datetime.utcnow().isoformat(),
         }
         for i in range(num_transactions)
     ]
 
+    # Bound concurrency so requests don't starve the connection pool
+    semaphore = asyncio.Semaphore(10)
+
     # Function to create a single transaction
     async def create_transaction(transaction):
-        return await async_client.post(
-            "/api/v1/transactions",
-            json=transaction,
-            headers={"Authorization": settings.API_KEY},
-        )
-
-    # Create all transactions concurrently
-    tasks = [create_transaction(tx) for tx in transactions]
-    responses = await asyncio.gather(*tasks)
+        async with semaphore:
+            return await async_client.post(
+                "/api/v1/transactions",
+                json=transaction,
+                headers=AUTH_HEADERS,
+            )
+
+    # Create all transactions concurrently, one failure shouldn't cancel the rest
+    responses = await asyncio.gather(
+        *(create_transaction(tx) for tx in transactions), return_exceptions=True
+    )
+    errors = [r for r in responses if isinstance(r, BaseException)]
+    assert not errors, errors
 
     # Verify all responses
     for i, response in enumerate(responses):
         assert response.status_code == 201, f"Transaction {i} failed: {response.text}"
 
-    # Allow time for the Celery tasks to complete
-    await asyncio.sleep(2)
-
     # Verify statistics
-    stats_response = await async_client.get(
-        "/api/v1/statistics", headers={"Authorization": settings.API_KEY}
-    )
+    stats_response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
     assert stats_response.status_code == 200
 
     stats_data = stats_response.json()
@@ -232,3 +452,35 @@ async def test_race_condition(async_client):
     stat_amounts = [tx["amount"] for tx in stats_data["top_transactions"]]
     for amount in top_three_amounts:
         assert amount in stat_amounts
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_race_condition_duplicate_ids(async_client, committed_db):
+    """Submit every transaction_id twice concurrently, only one of each may succeed"""
+
+    base = {
+        "user_id": "user1",
+        "amount": 100.0,
+        "currency": "USD",
+        "timestamp": _TS,
+    }
+    transactions = [{**base, "transaction_id": f"dup{i % 5}"} for i in range(10)]
+
+    async def create_transaction(transaction):
+        return await async_client.post(
+            "/api/v1/transactions",
+            json=transaction,
+            headers=AUTH_HEADERS,
+        )
+
+    responses = await asyncio.gather(
+        *(create_transaction(tx) for tx in transactions), return_exceptions=True
+    )
+    errors = [r for r in responses if isinstance(r, BaseException)]
+    assert not errors, errors
+
+    status_codes = sorted(response.status_code for response in responses)
+    assert status_codes == [201] * 5 + [400] * 5
+
+    stats_response = await async_client.get("/api/v1/statistics", headers=AUTH_HEADERS)
+    assert stats_response.json()["total_transactions"] == 5